@@ -0,0 +1,53 @@
+"""
+Optional Numba-accelerated LUT unpacking for convert_bin_to_cube.
+
+unpack_rgb is the old scalar texel loop kept as a single tight function:
+with Numba installed it JIT-compiles to native code (cached across runs),
+without it the same function runs as plain Python. convert_bin_to_cube
+only routes through it when the JIT is actually available; otherwise the
+NumPy reshape path wins.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+try:
+    from numba import njit
+
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):  # no-op stand-in so the module still imports
+        def wrap(func):
+            return func
+
+        return wrap
+
+
+@njit(cache=True)
+def unpack_rgb(payload: np.ndarray, size: int, mode: int) -> np.ndarray:
+    """
+    Unpack a flat uint8 payload into an (N, 3) float64 array in .cube order
+    (blue outer, green middle, red inner).
+    mode: 0 -> "rgb" (3 bytes/texel), 1 -> "bgr" (3 bytes/texel),
+          2 -> "rgba" (4 bytes/texel, alpha ignored)
+    """
+    n2 = size * size
+    inv_255 = 1.0 / 255.0
+    out = np.empty((size * n2, 3), np.float64)
+    i = 0
+    for b in range(size):
+        for g in range(size):
+            for r in range(size):
+                if mode == 0:
+                    idx = (r + g * size + b * n2) * 3
+                elif mode == 1:
+                    idx = (b + g * size + r * n2) * 3
+                else:
+                    idx = (r + g * size + b * n2) * 4
+                out[i, 0] = payload[idx] * inv_255
+                out[i, 1] = payload[idx + 1] * inv_255
+                out[i, 2] = payload[idx + 2] * inv_255
+                i += 1
+    return out
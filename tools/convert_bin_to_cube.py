@@ -11,18 +11,25 @@ structure, with filenames ending in .cube.
 """
 from __future__ import annotations
 
+import io
 import math
 import struct
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Iterable, Tuple
+from typing import Optional, Tuple
+
+import numpy as np
+
+from _cube_format import format_rows
+from _lut_numba import HAVE_NUMBA, unpack_rgb
 
 ROOT = Path(__file__).resolve().parent
 OUT_ROOT = ROOT / "converted_cubes"
 MS_MAGIC = b".MS-LUT "
 
 
-def read_ms_lut(data: bytes) -> Tuple[int, str, memoryview]:
-    """Parse a .MS-LUT file, returning (size, order, raw_rgb_bytes)."""
+def read_ms_lut(data: bytes) -> Tuple[int, str, int, int]:
+    """Parse a .MS-LUT file, returning (size, order, data_offset, payload_len)."""
     if len(data) < 48 or not data.startswith(MS_MAGIC):
         raise ValueError("missing .MS-LUT header")
 
@@ -46,12 +53,11 @@ def read_ms_lut(data: bytes) -> Tuple[int, str, memoryview]:
 
     # order_flag: 1 -> RGB order, 0 -> BGR order in the payload
     order = "rgb" if order_flag else "bgr"
-    payload = memoryview(data)[data_offset : data_offset + expected_data_len]
-    return size, order, payload
+    return size, order, data_offset, expected_data_len
 
 
-def read_raw_rgba(data: bytes) -> Tuple[int, str, memoryview]:
-    """Parse a raw RGBA8 volume, returning (size, order, raw_bytes)."""
+def read_raw_rgba(data: bytes) -> Tuple[int, str, int, int]:
+    """Parse a raw RGBA8 volume, returning (size, order, data_offset, payload_len)."""
     if len(data) % 4 != 0:
         raise ValueError("byte length not divisible by 4 for RGBA data")
 
@@ -61,53 +67,37 @@ def read_raw_rgba(data: bytes) -> Tuple[int, str, memoryview]:
         raise ValueError("byte length is not a perfect cube of RGBA texels")
 
     # These payloads appear to already be in RGB order with red fastest.
-    return size, "rgba", memoryview(data)
+    return size, "rgba", 0, len(data)
 
 
-def iter_values(size: int, payload: memoryview, order: str) -> Iterable[Tuple[float, float, float]]:
+def lut_array(size: int, payload: np.ndarray, order: str) -> np.ndarray:
     """
-    Yield normalized RGB triples in .cube order (blue outer, green middle, red inner).
+    Return an (N, 3) float array of normalized RGB triples in .cube order
+    (blue outer, green middle, red inner). payload is a flat uint8 view of
+    the raw texel bytes.
     order: "rgb" -> payload index = r + g*N + b*N*N (3 bytes per texel)
            "bgr" -> payload index = b + g*N + r*N*N (3 bytes per texel)
            "rgba"-> payload index = r + g*N + b*N*N (4 bytes per texel, ignores alpha)
     """
-    n2 = size * size
-    inv_255 = 1.0 / 255.0
+    mode = {"rgb": 0, "bgr": 1, "rgba": 2}.get(order)
+    if mode is None:
+        raise ValueError(f"unsupported order: {order}")
+    if HAVE_NUMBA:
+        # JIT-compiled scalar loop; compile cost is amortized across files.
+        return unpack_rgb(payload, size, mode)
     if order == "rgb":
-        for b in range(size):
-            for g in range(size):
-                base = (g * size + b * n2) * 3  # start of r=0 for this g,b
-                for r in range(size):
-                    idx = base + r * 3
-                    yield (
-                        payload[idx] * inv_255,
-                        payload[idx + 1] * inv_255,
-                        payload[idx + 2] * inv_255,
-                    )
+        # Payload axes are already (b, g, r, c) -- .cube memory order.
+        arr = payload.reshape(size, size, size, 3)
     elif order == "bgr":
-        for b in range(size):
-            for g in range(size):
-                base = (b + g * size) * 3
-                for r in range(size):
-                    idx = base + r * n2 * 3
-                    yield (
-                        payload[idx] * inv_255,
-                        payload[idx + 1] * inv_255,
-                        payload[idx + 2] * inv_255,
-                    )
-    elif order == "rgba":
-        for b in range(size):
-            for g in range(size):
-                base = (g * size + b * n2) * 4
-                for r in range(size):
-                    idx = base + r * 4
-                    yield (
-                        payload[idx] * inv_255,
-                        payload[idx + 1] * inv_255,
-                        payload[idx + 2] * inv_255,
-                    )
+        # Payload axes are (r, g, b, c); swap the outer axes into .cube order
+        # and materialize one C-contiguous copy up front, so every later pass
+        # (normalize, format) streams stride-1 memory instead of re-walking
+        # the N^2-strided transpose view.
+        arr = np.ascontiguousarray(payload.reshape(size, size, size, 3).transpose(2, 1, 0, 3))
     else:
-        raise ValueError(f"unsupported order: {order}")
+        arr = payload.reshape(size, size, size, 4)[..., :3]
+    # float64 keeps the printed %.6f values identical to the old scalar loop
+    return arr.reshape(-1, 3).astype(np.float64) * (1.0 / 255.0)
 
 
 def cube_path_for(src: Path) -> Path:
@@ -128,26 +118,41 @@ def cube_path_for(src: Path) -> Path:
 def convert_file(path: Path) -> Tuple[Path, int, str]:
     data = path.read_bytes()
     try:
-        size, order, payload = read_ms_lut(data)
+        size, order, data_offset, payload_len = read_ms_lut(data)
         source_type = "ms-lut"
     except ValueError:
-        size, order, payload = read_raw_rgba(data)
+        size, order, data_offset, payload_len = read_raw_rgba(data)
         source_type = "rgba"
 
+    # Zero-copy view straight onto the file buffer.
+    payload = np.frombuffer(data, np.uint8, count=payload_len, offset=data_offset)
+
     dest = cube_path_for(path)
     dest.parent.mkdir(parents=True, exist_ok=True)
 
-    with dest.open("w", encoding="ascii") as fh:
-        fh.write(f'TITLE "{path.name}"\n')
-        fh.write(f"LUT_3D_SIZE {size}\n")
-        fh.write("DOMAIN_MIN 0 0 0\n")
-        fh.write("DOMAIN_MAX 1 1 1\n")
-        for r, g, b in iter_values(size, payload, order):
-            fh.write(f"{r:.6f} {g:.6f} {b:.6f}\n")
+    # Assemble the whole file in memory and write it out in one shot.
+    buf = io.BytesIO()
+    buf.write(
+        f'TITLE "{path.name}"\n'
+        f"LUT_3D_SIZE {size}\n"
+        "DOMAIN_MIN 0 0 0\n"
+        "DOMAIN_MAX 1 1 1\n".encode("ascii")
+    )
+    buf.write(format_rows(lut_array(size, payload, order)))
+    dest.write_bytes(buf.getvalue())
 
     return dest, size, source_type
 
 
+def _convert_one(path: Path) -> Tuple[Path, Optional[Path], int, str]:
+    """Worker wrapper for convert_file that reports failures as a message."""
+    try:
+        dest, size, source = convert_file(path)
+    except Exception as exc:  # noqa: BLE001
+        return path, None, 0, str(exc)
+    return path, dest, size, source
+
+
 def main() -> None:
     OUT_ROOT.mkdir(exist_ok=True)
     bin_files = sorted(ROOT.rglob("*.bin"))
@@ -155,15 +160,15 @@ def main() -> None:
         print("No .bin files found.")
         return
 
+    # Files are independent CPU-bound jobs; convert them across all cores.
     successes = 0
-    for path in bin_files:
-        try:
-            dest, size, source = convert_file(path)
-        except Exception as exc:  # noqa: BLE001
-            print(f"[FAIL] {path}: {exc}")
-            continue
-        successes += 1
-        print(f"[OK] {path} -> {dest} ({source}, size={size})")
+    with ProcessPoolExecutor() as executor:
+        for path, dest, size, source in executor.map(_convert_one, bin_files, chunksize=8):
+            if dest is None:
+                print(f"[FAIL] {path}: {source}")
+                continue
+            successes += 1
+            print(f"[OK] {path} -> {dest} ({source}, size={size})")
 
     print(f"Converted {successes}/{len(bin_files)} files into {OUT_ROOT}")
 
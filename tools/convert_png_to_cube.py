@@ -1,10 +1,16 @@
+import io
 import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+
+import numpy as np
 from PIL import Image
 
-def convert_hald_clut(img_path, dest_path):
+from _cube_format import format_rows
+
+def convert_hald_clut(img, img_path, dest_path):
     print(f"Converting HaldCLUT: {img_path}")
-    img = Image.open(img_path).convert('RGB')
+    img = img.convert('RGB')
     width, height = img.size
 
     if width != 512 or height != 512:
@@ -15,39 +21,34 @@ def convert_hald_clut(img_path, dest_path):
     # HaldCLUT 64 is 8x8 tiles of 64x64 pixels
     tiles_per_row = 8
     
-    with open(dest_path, 'w') as f:
-        f.write(f'TITLE "{img_path.stem}"\n')
-        f.write(f'LUT_3D_SIZE {size}\n')
-        f.write('DOMAIN_MIN 0.0 0.0 0.0\n')
-        f.write('DOMAIN_MAX 1.0 1.0 1.0\n')
+    # Assemble the whole file in memory and write it out in one shot
+    buf = io.BytesIO()
+    buf.write(
+        f'TITLE "{img_path.stem}"\n'
+        f'LUT_3D_SIZE {size}\n'
+        'DOMAIN_MIN 0.0 0.0 0.0\n'
+        'DOMAIN_MAX 1.0 1.0 1.0\n'.encode('ascii')
+    )
 
-        # .cube format expects: 
-        # for B in 0..Size-1:
-        #   for G in 0..Size-1:
-        #     for R in 0..Size-1:
-        
-        pixels = img.load()
-        
-        for b in range(size):
-            bx = b % tiles_per_row
-            by = b // tiles_per_row
-            
-            base_x = bx * size
-            base_y = by * size
-            
-            for g in range(size):
-                for r in range(size):
-                    x = base_x + r
-                    y = base_y + g
-                    
-                    pixel = pixels[x, y]
-                    # pixel is (r, g, b) usually 0-255
-                    f.write(f'{pixel[0]/255.0:.6f} {pixel[1]/255.0:.6f} {pixel[2]/255.0:.6f}\n')
+    # .cube format expects:
+    # for B in 0..Size-1:
+    #   for G in 0..Size-1:
+    #     for R in 0..Size-1:
+
+    # Image axes are (y, x, c) = (by*64 + g, bx*64 + r, c) with
+    # b = by*8 + bx, so reordering to (by, bx, g, r, c) yields the
+    # (b, g, r) walk above in one reshape instead of 64^3 pixel reads.
+    arr = np.asarray(img, dtype=np.uint8).reshape(
+        tiles_per_row, size, tiles_per_row, size, 3
+    )
+    arr = arr.transpose(0, 2, 1, 3, 4).reshape(-1, 3)
+    buf.write(format_rows(arr.astype(np.float64) / 255.0))
+    Path(dest_path).write_bytes(buf.getvalue())
     print(f"Saved to {dest_path}")
 
-def convert_1d_lut(img_path, dest_path):
+def convert_1d_lut(img, img_path, dest_path):
     print(f"Converting 1D LUT: {img_path}")
-    img = Image.open(img_path).convert('RGB')
+    img = img.convert('RGB')
     width, height = img.size
     
     # Assuming horizontal strip
@@ -68,34 +69,45 @@ def convert_1d_lut(img_path, dest_path):
             f.write(f'{pixel[0]/255.0:.6f} {pixel[1]/255.0:.6f} {pixel[2]/255.0:.6f}\n')
     print(f"Saved to {dest_path}")
 
+def convert_one(img_path, dest_path):
+    # Open once; the size peek and the conversion share the same handle.
+    with Image.open(img_path) as img:
+        w, h = img.size
+
+        if w == 512 and h == 512:
+            convert_hald_clut(img, img_path, dest_path)
+        elif w == 256 and h == 1:
+            convert_1d_lut(img, img_path, dest_path)
+        else:
+            print(f"Skipping {img_path}: Unknown dimensions {w}x{h}")
+
 def main():
     src_dir = Path('/home/tqmane/git/lut-maker/extracted_luts')
     dest_dir = Path('/home/tqmane/git/lut-maker/converted_cubes/extracted_luts')
     dest_dir.mkdir(parents=True, exist_ok=True)
-    
+
     if not src_dir.exists():
         print(f"Source directory {src_dir} does not exist.")
         return
 
+    img_paths = []
+    dest_paths = []
     for img_path in src_dir.rglob('*.png'):
         # Calculate relative path to maintain folder structure
         rel_path = img_path.relative_to(src_dir)
         # Construct destination path
         dest_path = dest_dir / rel_path.with_suffix('.cube')
-        
+
         # Ensure parent directory exists
         dest_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        img = Image.open(img_path)
-        w, h = img.size
-        img.close()
-        
-        if w == 512 and h == 512:
-            convert_hald_clut(img_path, dest_path)
-        elif w == 256 and h == 1:
-            convert_1d_lut(img_path, dest_path)
-        else:
-            print(f"Skipping {img_path}: Unknown dimensions {w}x{h}")
+
+        img_paths.append(img_path)
+        dest_paths.append(dest_path)
+
+    # Conversions are independent; spread them across cores.
+    with ProcessPoolExecutor() as executor:
+        for _ in executor.map(convert_one, img_paths, dest_paths, chunksize=8):
+            pass
 
 if __name__ == "__main__":
     main()